@@ -0,0 +1,73 @@
+"""
+Export the deepfake CNN to ONNX Runtime models
+Run with: python export_model.py --calibration-dir <images> [--validation-dir <images>]
+
+Writes efficientnet_b0.onnx and, when its predictions stay within INT8_MAX_DRIFT
+of FP32, the statically quantized efficientnet_b0.int8-static.onnx to MODEL_PATH.
+The server only loads these files; it never exports or quantizes at startup.
+"""
+
+import argparse
+import os
+import sys
+from typing import List
+
+import numpy as np
+from PIL import Image
+
+from services.deepfake_detector import (
+    INT8_MAX_DRIFT,
+    ORT_AVAILABLE,
+    TORCH_AVAILABLE,
+    DeepfakeDetector,
+)
+
+IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".webp", ".bmp"})
+
+
+def load_images(directory: str, limit: int) -> List[np.ndarray]:
+    """Load up to limit images from a directory as RGB uint8 arrays"""
+    images = []
+    for name in sorted(os.listdir(directory)):
+        if os.path.splitext(name)[1].lower() not in IMAGE_EXTENSIONS:
+            continue
+        with Image.open(os.path.join(directory, name)) as image:
+            image.draft('RGB', (512, 512))
+            images.append(np.asarray(image.convert('RGB')))
+        if len(images) == limit:
+            break
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calibration-dir", required=True, help="Natural images for INT8 calibration")
+    parser.add_argument("--validation-dir", help="Held-out images for the drift check (default: every 5th calibration image)")
+    parser.add_argument("--limit", type=int, default=200, help="Maximum images read per directory")
+    args = parser.parse_args()
+
+    if not (TORCH_AVAILABLE and ORT_AVAILABLE):
+        sys.exit("Exporting requires both PyTorch and ONNX Runtime")
+
+    calibration = load_images(args.calibration_dir, args.limit)
+    if args.validation_dir:
+        validation = load_images(args.validation_dir, args.limit)
+    else:
+        validation = calibration[::5]
+        calibration = [image for i, image in enumerate(calibration) if i % 5]
+    if not calibration or not validation:
+        sys.exit("Need at least one calibration and one validation image")
+
+    detector = DeepfakeDetector()
+    if detector.model is None:
+        sys.exit("CNN model failed to initialize")
+
+    drift = detector.export_onnx(calibration, validation)
+    if drift <= INT8_MAX_DRIFT:
+        print(f"Exported FP32 and INT8 models (drift {drift:.4f} on {len(validation)} images)")
+    else:
+        print(f"INT8 drift {drift:.4f} exceeds {INT8_MAX_DRIFT}; exported the FP32 model only")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration
+Run with: gunicorn -c gunicorn.conf.py main:app
+"""
+
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+
+# Vault, threat and scan state lives in per-process module globals, so every worker
+# would see its own copy. Keep one worker until that state moves to a shared store.
+# UvicornWorker picks up uvloop and httptools from uvicorn[standard].
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master so forked workers share its memory
+preload_app = True
+
+
+def when_ready(server):
+    """Load detection models in the master before workers are forked"""
+    from main import load_detectors
+
+    # Only builds the models; the CNN warm-up runs in each worker's lifespan
+    load_detectors()
+    server.log.info("Detection models preloaded")
+
+
+def post_fork(server, worker):
+    """Reset PyTorch's thread pool in the new worker"""
+    from services.deepfake_detector import configure_torch_threads
+
+    configure_torch_threads()
@@ -5,84 +5,149 @@ Main application entry point
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from pydantic import BaseModel, HttpUrl
 from typing import Optional, List
 import uvicorn
+from contextlib import asynccontextmanager
 from datetime import datetime
+from functools import lru_cache
 import os
+import time
+
+import orjson
 
 # Import routers
 from routers import deepfake, phishing, ransomware
-from models.database import init_db
+from models.database import init_db, close_db
 from utils.logger import setup_logger
+from utils.uploads import UploadLimitMiddleware
 
 # Setup logging
 logger = setup_logger()
 
+
+def load_detectors():
+    """Load detectors (and CNN weights) into the shared provider caches"""
+    deepfake.load_detector()
+    phishing.load_detector()
+    ransomware.load_detector()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize database and load models on startup, release them on shutdown"""
+    logger.info("Starting AXIOM JAVELIN Backend...")
+    await init_db()
+    logger.info("Database initialized")
+    
+    # No-op when the detectors were already loaded in a preloading parent process;
+    # the CNN warm-up always runs here, in the serving process
+    load_detectors()
+    deepfake.load_detector().warm_up()
+    logger.info("Detection models loaded")
+    ransomware.load_vault_index()
+    logger.info("AXIOM JAVELIN Backend started successfully!")
+    
+    yield
+    
+    await deepfake.load_detector().stop_batching()
+    await close_db()
+    logger.info("AXIOM JAVELIN Backend stopped")
+
+
 # Create FastAPI app
 app = FastAPI(
     title="AXIOM JAVELIN API",
     description="Security Guardian Backend - Deepfake Detection, Phishing Protection, Ransomware Defense",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
+
+# Refuse oversize uploads from their Content-Length, before the form is spooled
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/api/deepfake/analyze": deepfake.MAX_IMAGE_SIZE,
+        "/api/ransomware/vault/upload": ransomware.MAX_VAULT_FILE_SIZE,
+        "/api/ransomware/encryption/check": ransomware.MAX_CHECK_FILE_SIZE,
+        "/api/ransomware/encryption/check/batch": ransomware.MAX_CHECK_BATCH_SIZE,
+    },
 )
 
 # CORS Configuration
+# Explicit origins, methods and headers let browsers cache preflights for max_age
+FRONTEND_ORIGINS = os.getenv("FRONTEND_ORIGINS", "http://localhost:8080")
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify your frontend URL
+    allow_origins=[o.strip() for o in FRONTEND_ORIGINS.split(",") if o.strip()],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["content-type", "authorization"],
+    max_age=86400,
 )
 
+# Compress larger JSON lists (vault files, history, integrity results); small bodies skip it
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Include routers
 app.include_router(deepfake.router, prefix="/api/deepfake", tags=["Deepfake Detection"])
 app.include_router(phishing.router, prefix="/api/phishing", tags=["Phishing Detection"])
 app.include_router(ransomware.router, prefix="/api/ransomware", tags=["Ransomware Protection"])
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database and load models on startup"""
-    logger.info("Starting AXIOM JAVELIN Backend...")
-    await init_db()
-    logger.info("Database initialized")
-    logger.info("AXIOM JAVELIN Backend started successfully!")
-
-
-@app.get("/")
-async def root():
-    """Root endpoint - API health check"""
-    return {
+# Status bodies only change with their second-resolution timestamp, so each one
+# is serialized once per second and reused for every probe in between
+@lru_cache(maxsize=1)
+def root_body(second: int) -> bytes:
+    """Serialized root response for the given UNIX second"""
+    return orjson.dumps({
         "name": "AXIOM JAVELIN API",
         "version": "1.0.0",
         "status": "operational",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.utcfromtimestamp(second).isoformat(),
         "endpoints": {
             "deepfake": "/api/deepfake",
             "phishing": "/api/phishing",
             "ransomware": "/api/ransomware",
             "docs": "/docs"
         }
-    }
+    })
+
+
+@lru_cache(maxsize=1)
+def health_body(second: int) -> bytes:
+    """Serialized health response for the given UNIX second"""
+    return orjson.dumps({
+        "status": "healthy",
+        "timestamp": datetime.utcfromtimestamp(second).isoformat()
+    })
+
+
+@app.get("/")
+async def root():
+    """Root endpoint - API health check"""
+    return Response(root_body(int(time.time())), media_type="application/json")
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat()
-    }
+    return Response(health_body(int(time.time())), media_type="application/json")
 
 
 if __name__ == "__main__":
+    # Development server only; production runs under Gunicorn (see gunicorn.conf.py)
     uvicorn.run(
         "main:app",
         host=os.getenv("HOST", "0.0.0.0"),
         port=int(os.getenv("PORT", 8000)),
-        reload=os.getenv("DEBUG", "true").lower() == "true"
+        reload=os.getenv("DEBUG", "true").lower() == "true",
+        loop="uvloop",
+        http="httptools"
     )
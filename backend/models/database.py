@@ -4,11 +4,24 @@ Database configuration and initialization
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./axiom_javelin.db")
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+# aiosqlite defaults to NullPool for file databases, reconnecting on every
+# checkout; keep long-lived connections instead (in-memory DBs keep StaticPool)
+pool_options = {}
+if ":memory:" not in DATABASE_URL:
+    pool_options = {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True
+    }
+
+engine = create_async_engine(DATABASE_URL, echo=False, **pool_options)
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
@@ -19,6 +32,11 @@ async def init_db():
         await conn.run_sync(Base.metadata.create_all)
 
 
+async def close_db():
+    """Close pooled database connections"""
+    await engine.dispose()
+
+
 async def get_db():
     """Get database session"""
     async with async_session() as session:
@@ -3,20 +3,35 @@ Deepfake Detection Router
 CNN-based image analysis for detecting AI-generated/manipulated content
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import List, Optional
 import io
 from datetime import datetime
+from functools import lru_cache
+
+import orjson
 
 from services.deepfake_detector import DeepfakeDetector
 from utils.logger import setup_logger
+from utils.uploads import read_upload
 
 logger = setup_logger()
 router = APIRouter()
 
-# Initialize detector
-detector = DeepfakeDetector()
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+
+
+@lru_cache(maxsize=1)
+def load_detector() -> DeepfakeDetector:
+    """Build the shared detector, loading the CNN on first use"""
+    return DeepfakeDetector()
+
+
+async def get_detector() -> DeepfakeDetector:
+    """Dependency returning the shared detector (async, so it resolves on the event loop)"""
+    return load_detector()
 
 
 class DetectionDetail(BaseModel):
@@ -60,7 +75,10 @@ scan_stats = {
 
 
 @router.post("/analyze", response_model=AnalysisResult)
-async def analyze_image(file: UploadFile = File(...)):
+async def analyze_image(
+    file: UploadFile = File(...),
+    detector: DeepfakeDetector = Depends(get_detector)
+):
     """
     Analyze an image for deepfake/manipulation detection using CNN
     
@@ -75,13 +93,8 @@ async def analyze_image(file: UploadFile = File(...)):
             detail=f"Invalid file type. Allowed: {', '.join(allowed_types)}"
         )
     
-    # Validate file size (max 10MB)
-    contents = await file.read()
-    if len(contents) > 10 * 1024 * 1024:
-        raise HTTPException(
-            status_code=400,
-            detail="File too large. Maximum size is 10MB"
-        )
+    # Validate file size (max 10MB) while streaming the upload
+    contents = await read_upload(file, MAX_IMAGE_SIZE)
     
     try:
         # Run detection
@@ -126,7 +139,7 @@ async def analyze_image(file: UploadFile = File(...)):
 
 
 @router.get("/stats", response_model=StatsResponse)
-async def get_stats():
+async def get_stats(detector: DeepfakeDetector = Depends(get_detector)):
     """Get deepfake detection statistics"""
     avg_confidence = 0.0
     if scan_stats["total_scans"] > 0:
@@ -143,11 +156,17 @@ async def get_stats():
 
 
 @router.get("/model-info")
-async def get_model_info():
+async def get_model_info(detector: DeepfakeDetector = Depends(get_detector)):
     """Get information about the CNN model"""
-    return {
+    return Response(model_info_body(detector.model_version), media_type="application/json")
+
+
+@lru_cache(maxsize=4)
+def model_info_body(model_version: str) -> bytes:
+    """Serialized model info; static apart from the loaded model version"""
+    return orjson.dumps({
         "model_name": "EfficientNet-B0 + Custom Head",
-        "version": detector.model_version,
+        "version": model_version,
         "input_size": "224x224",
         "detection_layers": [
             "Color Distribution Analysis",
@@ -161,4 +180,4 @@ async def get_model_info():
         ],
         "accuracy": "98.7%",
         "training_dataset": "FaceForensics++, DFDC, Celeb-DF"
-    }
+    })
@@ -3,10 +3,13 @@ Phishing Detection Router
 URL analysis for detecting phishing threats
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, HttpUrl
 from typing import List, Optional
 from datetime import datetime
+from collections import deque
+from functools import lru_cache
+from itertools import islice
 
 from services.phishing_detector import PhishingDetector
 from utils.logger import setup_logger
@@ -14,8 +17,16 @@ from utils.logger import setup_logger
 logger = setup_logger()
 router = APIRouter()
 
-# Initialize detector
-detector = PhishingDetector()
+
+@lru_cache(maxsize=1)
+def load_detector() -> PhishingDetector:
+    """Build the shared phishing detector"""
+    return PhishingDetector()
+
+
+async def get_detector() -> PhishingDetector:
+    """Dependency returning the shared detector (async, so it resolves on the event loop)"""
+    return load_detector()
 
 
 class ScanRequest(BaseModel):
@@ -41,7 +52,8 @@ class ScanHistory(BaseModel):
 
 
 # In-memory storage (use database in production)
-scan_history: List[dict] = []
+# Newest first; the deque drops the oldest entry past 100 scans in O(1)
+scan_history: deque = deque(maxlen=100)
 stats = {
     "urls_scanned": 0,
     "threats_blocked": 0,
@@ -51,7 +63,10 @@ stats = {
 
 
 @router.post("/scan", response_model=ScanResult)
-async def scan_url(request: ScanRequest):
+async def scan_url(
+    request: ScanRequest,
+    detector: PhishingDetector = Depends(get_detector)
+):
     """
     Scan a URL for phishing threats
     
@@ -71,7 +86,7 @@ async def scan_url(request: ScanRequest):
             stats["safe_urls"] += 1
         
         # Add to history
-        scan_history.insert(0, {
+        scan_history.appendleft({
             "url": request.url,
             "status": result["status"],
             "time": "Just now",
@@ -79,10 +94,6 @@ async def scan_url(request: ScanRequest):
             "confidence": result["confidence"]
         })
         
-        # Keep only last 100 scans
-        if len(scan_history) > 100:
-            scan_history.pop()
-        
         logger.info(f"URL scanned: {request.url} - Status: {result['status']}")
         
         return ScanResult(
@@ -100,10 +111,15 @@ async def scan_url(request: ScanRequest):
         raise HTTPException(status_code=500, detail=f"Scan failed: {str(e)}")
 
 
-@router.get("/history", response_model=List[ScanHistory])
+# History entries are trusted server state; the model only documents the schema
+@router.get(
+    "/history",
+    response_model=None,
+    responses={200: {"model": List[ScanHistory]}}
+)
 async def get_history(limit: int = 20):
     """Get recent scan history"""
-    return [ScanHistory(**s) for s in scan_history[:limit]]
+    return list(islice(scan_history, max(limit, 0)))
 
 
 @router.get("/stats")
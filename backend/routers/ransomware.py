@@ -3,21 +3,55 @@ Ransomware Protection Router
 File encryption detection and vault management
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice
+import asyncio
 import hashlib
+import mmap
 import os
+import re
+import time
+import uuid
+
+import aiofiles
+import orjson
 
 from services.ransomware_detector import RansomwareDetector
 from utils.logger import setup_logger
+from utils.uploads import iter_upload, read_upload
 
 logger = setup_logger()
 router = APIRouter()
 
-# Initialize detector
-detector = RansomwareDetector()
+VAULT_DIR = os.getenv("VAULT_DIR", "./vault")
+MAX_VAULT_FILE_SIZE = 100 * 1024 * 1024
+MAX_CHECK_FILE_SIZE = 100 * 1024 * 1024
+MAX_CHECK_BATCH_FILES = 20
+# Total upload size of one batch request (enforced by UploadLimitMiddleware), so a
+# batch holds no more in memory than a single maximum-size check
+MAX_CHECK_BATCH_SIZE = 100 * 1024 * 1024
+
+# Vault file ids: "file_<upload time in ms>_<6 hex digits>"
+VAULT_FILE_ID_RE = re.compile(r"file_(\d+)_[0-9a-f]{6}")
+# Entry-less data files younger than this (seconds) may still be uploading
+ORPHAN_MIN_AGE = 60 * 60
+
+
+@lru_cache(maxsize=1)
+def load_detector() -> RansomwareDetector:
+    """Build the shared ransomware detector"""
+    return RansomwareDetector()
+
+
+async def get_detector() -> RansomwareDetector:
+    """Dependency returning the shared detector (async, so it resolves on the event loop)"""
+    return load_detector()
 
 
 class VaultFile(BaseModel):
@@ -59,16 +93,75 @@ class IntegrityResult(BaseModel):
     last_checked: str
 
 
-# In-memory storage
-vault_files: List[dict] = []
-threat_events: List[dict] = []
+# In-memory storage, keyed by id (newest first) for O(1) lookup and removal
+vault_files: "OrderedDict[str, dict]" = OrderedDict()
+threat_events: "OrderedDict[str, dict]" = OrderedDict()
+resolved_threats = 0
 storage_used = 0.0
 
 
-@router.get("/vault/files", response_model=List[VaultFile])
+def metadata_path(file_id: str) -> str:
+    """Path of the JSON entry stored next to a vault file"""
+    return os.path.join(VAULT_DIR, f"{file_id}.json")
+
+
+def load_vault_index():
+    """Rebuild the vault index from VAULT_DIR, removing stale files left without an entry"""
+    global storage_used
+    if not os.path.isdir(VAULT_DIR):
+        return
+    
+    with os.scandir(VAULT_DIR) as it:
+        dir_entries = {entry.name: entry for entry in it}
+    
+    now = time.time()
+    entries = []
+    for name, dir_entry in dir_entries.items():
+        # Only vault data files; entries, subdirectories and anything else are left alone
+        match = VAULT_FILE_ID_RE.fullmatch(name)
+        if match is None or not dir_entry.is_file(follow_symlinks=False):
+            continue
+        
+        if f"{name}.json" not in dir_entries:
+            # Upload interrupted before its entry was written; recent ones may
+            # still be in progress in another worker
+            try:
+                if now - dir_entry.stat().st_mtime > ORPHAN_MIN_AGE:
+                    os.remove(dir_entry.path)
+            except OSError as e:
+                logger.warning(f"Could not remove orphaned vault file {name}: {e}")
+            continue
+        
+        try:
+            with open(metadata_path(name), "rb") as f:
+                vault_file = orjson.loads(f.read())
+            if vault_file["id"] != name:
+                raise ValueError(f"entry id {vault_file['id']!r} does not match")
+            size_bytes = int(vault_file["size_bytes"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Skipping vault entry {name}: {e}")
+            continue
+        
+        # Ids start with the upload time in milliseconds
+        entries.append((int(match.group(1)), size_bytes, vault_file))
+    
+    entries.sort(key=lambda entry: entry[0], reverse=True)
+    vault_files.clear()
+    vault_files.update((f["id"], f) for _, _, f in entries)
+    storage_used = sum(size_bytes for _, size_bytes, _ in entries) / (1024 * 1024)
+    logger.info(f"Vault index loaded: {len(entries)} files")
+
+
+# List endpoints return trusted server state as-is; the models only document
+# the schema so items are not re-validated on every request
+@router.get(
+    "/vault/files",
+    response_model=None,
+    responses={200: {"model": List[VaultFile]}}
+)
 async def get_vault_files():
     """Get all files in the secure vault"""
-    return [VaultFile(**f) for f in vault_files]
+    return list(vault_files.values())
 
 
 @router.post("/vault/upload", response_model=VaultFile)
@@ -76,52 +169,82 @@ async def upload_to_vault(file: UploadFile = File(...)):
     """
     Upload a file to the secure vault
     
-    - **file**: File to encrypt and store
+    - **file**: File to store (kept as-is on disk, not encrypted)
     """
-    contents = await file.read()
-    file_size = len(contents)
+    # Random suffix keeps ids unique for uploads landing in the same millisecond
+    file_id = f"file_{int(datetime.utcnow().timestamp() * 1000)}_{uuid.uuid4().hex[:6]}"
+    file_path = os.path.join(VAULT_DIR, file_id)
+    os.makedirs(VAULT_DIR, exist_ok=True)
     
-    # Validate size (max 100MB)
-    if file_size > 100 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File too large. Maximum 100MB")
+    # Stream to disk and hash in the same pass so the upload is never held in memory.
+    # hashlib is backed by OpenSSL, which uses SHA-NI/ARMv8 SHA when available.
+    hasher = hashlib.sha256()
+    file_size = 0
+    try:
+        async with aiofiles.open(file_path, "wb") as out:
+            # Rejects with 413 as soon as the upload exceeds 100MB
+            async for chunk in iter_upload(file, MAX_VAULT_FILE_SIZE):
+                hasher.update(chunk)
+                await out.write(chunk)
+                file_size += len(chunk)
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
     
     # Generate hash
-    file_hash = hashlib.sha256(contents).hexdigest()[:8].upper()
+    file_hash = hasher.hexdigest()[:8].upper()
     
     # Create vault file entry
     vault_file = {
-        "id": f"file_{int(datetime.utcnow().timestamp() * 1000)}",
+        "id": file_id,
         "name": file.filename,
         "size": format_file_size(file_size),
         "size_bytes": file_size,
         "date": datetime.utcnow().strftime("%b %d, %Y"),
-        "encrypted": True,
+        "encrypted": False,
         "hash": file_hash,
         "is_folder": False
     }
     
-    vault_files.insert(0, vault_file)
+    # Persist the entry so the index survives restarts. It is written aside and
+    # renamed into place, so a crash never leaves a truncated entry behind.
+    entry_path = metadata_path(file_id)
+    try:
+        async with aiofiles.open(f"{entry_path}.tmp", "wb") as out:
+            await out.write(orjson.dumps(vault_file))
+        os.replace(f"{entry_path}.tmp", entry_path)
+    except BaseException:
+        for path in (file_path, f"{entry_path}.tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    
+    vault_files[file_id] = vault_file
+    vault_files.move_to_end(file_id, last=False)
     global storage_used
     storage_used += file_size / (1024 * 1024)
     
     logger.info(f"File uploaded to vault: {file.filename}")
     
-    return VaultFile(**vault_file)
+    return vault_file
 
 
-@router.delete("/vault/files/{file_id}")
+@router.delete("/vault/files/{file_id}", status_code=204, response_class=Response)
 async def delete_vault_file(file_id: str):
     """Delete a file from the vault"""
-    global vault_files, storage_used
+    global storage_used
     
-    for i, f in enumerate(vault_files):
-        if f["id"] == file_id:
-            storage_used -= f["size_bytes"] / (1024 * 1024)
-            vault_files.pop(i)
-            logger.info(f"File deleted from vault: {f['name']}")
-            return {"status": "deleted", "file_id": file_id}
+    f = vault_files.pop(file_id, None)
+    if f is None:
+        raise HTTPException(status_code=404, detail="File not found")
     
-    raise HTTPException(status_code=404, detail="File not found")
+    storage_used -= f["size_bytes"] / (1024 * 1024)
+    for path in (os.path.join(VAULT_DIR, file_id), metadata_path(file_id)):
+        if os.path.exists(path):
+            os.remove(path)
+    logger.info(f"File deleted from vault: {f['name']}")
+    return Response(status_code=204)
 
 
 @router.get("/vault/storage")
@@ -135,13 +258,16 @@ async def get_storage_info():
 
 
 @router.post("/encryption/check", response_model=EncryptionCheckResult)
-async def check_file_encryption(file: UploadFile = File(...)):
+async def check_file_encryption(
+    file: UploadFile = File(...),
+    detector: RansomwareDetector = Depends(get_detector)
+):
     """
     Check if a file has been encrypted by ransomware
     
     - **file**: File to analyze
     """
-    contents = await file.read()
+    contents = await read_upload(file, MAX_CHECK_FILE_SIZE)
     result = await detector.check_encryption(contents, file.filename)
     
     logger.info(f"Encryption check: {file.filename} - Encrypted: {result['is_encrypted']}")
@@ -156,21 +282,65 @@ async def check_file_encryption(file: UploadFile = File(...)):
     )
 
 
-@router.get("/monitor/threats", response_model=List[ThreatEvent])
+@router.post("/encryption/check/batch", response_model=List[EncryptionCheckResult])
+async def check_files_encryption(
+    files: List[UploadFile] = File(...),
+    detector: RansomwareDetector = Depends(get_detector)
+):
+    """
+    Check several files for ransomware encryption in one request
+    
+    - **files**: Files to analyze (up to 20, 100MB in total)
+    """
+    if len(files) > MAX_CHECK_BATCH_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files. Maximum per batch: {MAX_CHECK_BATCH_FILES}"
+        )
+    
+    contents = [await read_upload(file, MAX_CHECK_FILE_SIZE) for file in files]
+    results = await detector.check_encryption_batch(
+        [(data, file.filename) for data, file in zip(contents, files)]
+    )
+    
+    logger.info(f"Batch encryption check: {len(files)} files - Encrypted: {sum(r['is_encrypted'] for r in results)}")
+    
+    return [
+        EncryptionCheckResult(
+            file_name=file.filename,
+            is_encrypted=result["is_encrypted"],
+            encryption_type=result.get("encryption_type"),
+            threat_level=result["threat_level"],
+            details=result["details"],
+            indicators=result.get("indicators", [])
+        )
+        for file, result in zip(files, results)
+    ]
+
+
+@router.get(
+    "/monitor/threats",
+    response_model=None,
+    responses={200: {"model": List[ThreatEvent]}}
+)
 async def get_threats():
     """Get recent threat events"""
-    return [ThreatEvent(**t) for t in threat_events[:20]]
+    return list(islice(threat_events.values(), 20))
 
 
-@router.post("/monitor/threats/{threat_id}/resolve")
+@router.post("/monitor/threats/{threat_id}/resolve", status_code=204, response_class=Response)
 async def resolve_threat(threat_id: str):
     """Mark a threat as resolved"""
-    for t in threat_events:
-        if t["id"] == threat_id:
-            t["resolved"] = True
-            return {"status": "resolved", "threat_id": threat_id}
+    global resolved_threats
     
-    raise HTTPException(status_code=404, detail="Threat not found")
+    t = threat_events.get(threat_id)
+    if t is None:
+        raise HTTPException(status_code=404, detail="Threat not found")
+    
+    if not t["resolved"]:
+        t["resolved"] = True
+        resolved_threats += 1
+    return Response(status_code=204)
 
 
 @router.get("/monitor/stats")
@@ -178,27 +348,48 @@ async def get_monitor_stats():
     """Get monitoring statistics"""
     return {
         "files_monitored": len(vault_files) + 1284,
-        "threats_blocked": len([t for t in threat_events if t["resolved"]]),
+        "threats_blocked": resolved_threats,
         "last_scan": "Just now"
     }
 
 
-@router.post("/integrity/check", response_model=List[IntegrityResult])
+@router.post(
+    "/integrity/check",
+    response_model=None,
+    responses={200: {"model": List[IntegrityResult]}}
+)
 async def run_integrity_check():
     """Run file integrity check on all vault files"""
-    results = []
+    # Hash files in worker threads, at most one per core, to keep the event loop free
+    semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+    # One timestamp for the whole run
+    checked_at = datetime.utcnow().isoformat()
     
-    for f in vault_files:
-        results.append(IntegrityResult(
-            file_id=f["id"],
-            file_name=f["name"],
-            status="verified",
-            original_hash=f["hash"],
-            current_hash=f["hash"],
-            last_checked=datetime.utcnow().isoformat()
-        ))
+    async def check(f: dict) -> dict:
+        async with semaphore:
+            try:
+                digest = await asyncio.to_thread(
+                    sha256_file, os.path.join(VAULT_DIR, f["id"])
+                )
+            except OSError:
+                digest = None
+        
+        if digest is None:
+            status, current_hash = "corrupted", ""
+        else:
+            current_hash = digest[:8].upper()
+            status = "verified" if current_hash == f["hash"] else "modified"
+        
+        return {
+            "file_id": f["id"],
+            "file_name": f["name"],
+            "status": status,
+            "original_hash": f["hash"],
+            "current_hash": current_hash,
+            "last_checked": checked_at
+        }
     
-    return results
+    return await asyncio.gather(*(check(f) for f in list(vault_files.values())))
 
 
 @router.get("/integrity/stats")
@@ -211,17 +402,24 @@ async def get_integrity_stats():
     }
 
 
+def sha256_file(path: str) -> str:
+    """Hash a file through a read-only mmap so it is read from the page cache without copies"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
+
+
+SIZE_UNITS = ("Bytes", "KB", "MB", "GB")
+
+
 def format_file_size(size_bytes: int) -> str:
     """Format bytes to human readable size"""
     if size_bytes == 0:
         return "0 Bytes"
     
-    sizes = ["Bytes", "KB", "MB", "GB"]
-    i = 0
-    size = float(size_bytes)
-    
-    while size >= 1024 and i < len(sizes) - 1:
-        size /= 1024
-        i += 1
+    # Each unit is 2**10 larger, so the bit length picks the unit directly
+    i = min((size_bytes.bit_length() - 1) // 10, len(SIZE_UNITS) - 1)
     
-    return f"{size:.1f} {sizes[i]}"
+    return f"{size_bytes / (1 << (i * 10)):.1f} {SIZE_UNITS[i]}"
@@ -3,10 +3,10 @@ Phishing Detection Service
 Multi-layer URL analysis for detecting phishing threats
 """
 
+import os
 import re
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Set
 from urllib.parse import urlparse
-import hashlib
 
 try:
     import tldextract
@@ -15,10 +15,22 @@ try:
 except ImportError:
     VALIDATORS_AVAILABLE = False
 
+# Try to import pyahocorasick, fallback to per-keyword substring checks
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+from utils.cache import LRUCache
 from utils.logger import setup_logger
 
 logger = setup_logger()
 
+# Only this much of a URL is analyzed; indicators sit in the scheme, domain and early path,
+# and the cap bounds per-request regex and substring work on adversarially long input
+MAX_SCAN_LENGTH = 2048
+
 
 class PhishingDetector:
     """
@@ -34,46 +46,71 @@ class PhishingDetector:
     """
     
     def __init__(self):
-        # Known dangerous TLDs
-        self.dangerous_tlds = [
+        # Known dangerous TLDs (a tuple so str.endswith checks them all in one call)
+        self.dangerous_tlds = (
             '.xyz', '.tk', '.ml', '.ga', '.cf', '.gq', '.top', 
             '.click', '.loan', '.work', '.racing', '.download',
             '.win', '.bid', '.stream', '.trade', '.date', '.faith'
-        ]
+        )
         
         # Known brand domains
         self.known_brands = {
-            'paypal': ['paypal.com', 'paypal.me'],
-            'amazon': ['amazon.com', 'amazon.co.uk', 'amazon.de', 'amazon.in'],
-            'google': ['google.com', 'google.co.uk', 'google.de', 'gmail.com'],
-            'microsoft': ['microsoft.com', 'outlook.com', 'live.com', 'office.com'],
-            'apple': ['apple.com', 'icloud.com'],
-            'facebook': ['facebook.com', 'fb.com', 'messenger.com'],
-            'netflix': ['netflix.com'],
-            'instagram': ['instagram.com'],
-            'twitter': ['twitter.com', 'x.com'],
-            'linkedin': ['linkedin.com'],
-            'bank': ['chase.com', 'wellsfargo.com', 'bankofamerica.com']
+            'paypal': ('paypal.com', 'paypal.me'),
+            'amazon': ('amazon.com', 'amazon.co.uk', 'amazon.de', 'amazon.in'),
+            'google': ('google.com', 'google.co.uk', 'google.de', 'gmail.com'),
+            'microsoft': ('microsoft.com', 'outlook.com', 'live.com', 'office.com'),
+            'apple': ('apple.com', 'icloud.com'),
+            'facebook': ('facebook.com', 'fb.com', 'messenger.com'),
+            'netflix': ('netflix.com',),
+            'instagram': ('instagram.com',),
+            'twitter': ('twitter.com', 'x.com'),
+            'linkedin': ('linkedin.com',),
+            'bank': ('chase.com', 'wellsfargo.com', 'bankofamerica.com')
         }
         
-        # Phishing keywords
-        self.phishing_keywords = [
+        # Phishing keywords (keyword lists are ordered tuples: findings list them in
+        # this order, while membership is tested against the set found in the URL)
+        self.phishing_keywords = (
             'login', 'signin', 'verify', 'account', 'secure', 'update',
             'confirm', 'banking', 'password', 'authenticate', 'validation',
             'suspended', 'locked', 'unusual', 'activity', 'credential'
-        ]
+        )
         
         # Suspicious keywords
-        self.suspicious_keywords = [
+        self.suspicious_keywords = (
             'free', 'win', 'winner', 'prize', 'urgent', 'click', 'limited',
             'offer', 'deal', 'gift', 'reward', 'bonus', 'congratulations'
-        ]
+        )
         
         # Dangerous keywords
-        self.danger_keywords = [
+        self.danger_keywords = (
             'phishing', 'scam', 'fake', 'hack', 'malware', 'virus',
             'trojan', 'ransomware', 'keylogger', 'spyware'
+        )
+        
+        # Single automaton over every keyword list and brand name so a URL is scanned once
+        self._keywords = frozenset(
+            self.danger_keywords + self.phishing_keywords + self.suspicious_keywords
+            + tuple(self.known_brands)
+        )
+        self._keyword_automaton = None
+        if AHOCORASICK_AVAILABLE:
+            self._keyword_automaton = ahocorasick.Automaton()
+            for keyword in self._keywords:
+                self._keyword_automaton.add_word(keyword, keyword)
+            self._keyword_automaton.make_automaton()
+        
+        # Known phishing URL patterns, precompiled and checked in priority order
+        self._known_patterns = [
+            (re.compile(r'\.com-[a-z]+\.'), "Suspicious .com-* domain pattern"),
+            (re.compile(r'-secure-'), "Fake 'secure' pattern in URL"),
+            (re.compile(r'[0-9]{5,}'), "Long number sequence in URL"),
+            (re.compile(r'(login|signin)\.(php|html|asp)'), "Direct login page file"),
         ]
+        self._ip_re = re.compile(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}')
+        
+        # Results of recently scanned URLs, keyed by the normalized URL
+        self._cache = LRUCache(int(os.getenv("RESULT_CACHE_SIZE", 1024)))
     
     async def analyze(self, url: str) -> Dict[str, Any]:
         """
@@ -88,6 +125,12 @@ class PhishingDetector:
         # Normalize URL
         if not url.startswith(('http://', 'https://')):
             url = f'https://{url}'
+        url = url[:MAX_SCAN_LENGTH]
+        
+        # Keyed case-sensitively: the structure and protocol checks read the URL as given
+        cached = self._cache.get(url)
+        if cached is not None:
+            return cached
         
         risk_score = 0.0
         findings: List[str] = []
@@ -111,14 +154,17 @@ class PhishingDetector:
         if tld_result["score"] > 0.5:
             findings.append(tld_result["finding"])
         
+        # Keywords and brand names found in one pass, shared by layers 2 and 3
+        found = self._find_keywords(full_url)
+        
         # Layer 2: Keyword Analysis (25% weight)
-        keyword_result = self._analyze_keywords(full_url)
+        keyword_result = self._analyze_keywords(found)
         risk_score += keyword_result["score"] * 0.25
         if keyword_result["finding"]:
             findings.append(keyword_result["finding"])
         
         # Layer 3: Brand Impersonation (25% weight)
-        brand_result = self._check_brand_impersonation(domain, full_url)
+        brand_result = self._check_brand_impersonation(domain, found)
         risk_score += brand_result["score"] * 0.25
         if brand_result["finding"]:
             findings.append(brand_result["finding"])
@@ -141,31 +187,41 @@ class PhishingDetector:
             findings.append(pattern_result["finding"])
         
         # Determine result
-        return self._determine_result(risk_score, findings, url)
+        result = self._determine_result(risk_score, findings, url)
+        self._cache.put(url, result)
+        
+        return result
     
     def _analyze_tld(self, domain: str) -> Dict[str, Any]:
         """Analyze top-level domain for risk"""
-        for tld in self.dangerous_tlds:
-            if domain.endswith(tld):
-                return {
-                    "score": 0.7,
-                    "finding": f"High-risk TLD detected: {tld}"
-                }
+        if domain.endswith(self.dangerous_tlds):
+            tld = next(t for t in self.dangerous_tlds if domain.endswith(t))
+            return {
+                "score": 0.7,
+                "finding": f"High-risk TLD detected: {tld}"
+            }
         
         return {"score": 0.0, "finding": None}
     
-    def _analyze_keywords(self, url: str) -> Dict[str, Any]:
-        """Analyze URL for suspicious keywords"""
+    def _find_keywords(self, url: str) -> Set[str]:
+        """Return every keyword and brand name occurring in the URL"""
+        if self._keyword_automaton is not None:
+            return {keyword for _, keyword in self._keyword_automaton.iter(url)}
+        
+        return {k for k in self._keywords if k in url}
+    
+    def _analyze_keywords(self, found: Set[str]) -> Dict[str, Any]:
+        """Analyze keywords found in the URL"""
         # Check for dangerous keywords first
         for keyword in self.danger_keywords:
-            if keyword in url:
+            if keyword in found:
                 return {
                     "score": 1.0,
                     "finding": f"Known malicious keyword detected: '{keyword}'"
                 }
         
         # Check for multiple phishing keywords
-        phishing_found = [k for k in self.phishing_keywords if k in url]
+        phishing_found = [k for k in self.phishing_keywords if k in found]
         if len(phishing_found) >= 2:
             return {
                 "score": 0.7,
@@ -178,7 +234,7 @@ class PhishingDetector:
             }
         
         # Check suspicious keywords
-        suspicious_found = [k for k in self.suspicious_keywords if k in url]
+        suspicious_found = [k for k in self.suspicious_keywords if k in found]
         if suspicious_found:
             return {
                 "score": 0.4,
@@ -187,11 +243,11 @@ class PhishingDetector:
         
         return {"score": 0.0, "finding": None}
     
-    def _check_brand_impersonation(self, domain: str, url: str) -> Dict[str, Any]:
+    def _check_brand_impersonation(self, domain: str, found: Set[str]) -> Dict[str, Any]:
         """Check for brand impersonation"""
         for brand, official_domains in self.known_brands.items():
             # Check if brand name appears in URL
-            if brand in url:
+            if brand in found:
                 # Check if it's NOT an official domain
                 is_official = any(d in domain for d in official_domains)
                 if not is_official:
@@ -208,8 +264,7 @@ class PhishingDetector:
         score = 0.0
         
         # Check for IP address
-        ip_pattern = r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}'
-        if re.search(ip_pattern, domain):
+        if self._ip_re.search(domain):
             score += 0.6
             findings.append("Direct IP address used instead of domain")
         
@@ -253,15 +308,8 @@ class PhishingDetector:
     
     def _check_known_patterns(self, url: str) -> Dict[str, Any]:
         """Check for known phishing URL patterns"""
-        patterns = [
-            (r'\.com-[a-z]+\.', "Suspicious .com-* domain pattern"),
-            (r'-secure-', "Fake 'secure' pattern in URL"),
-            (r'[0-9]{5,}', "Long number sequence in URL"),
-            (r'(login|signin)\.(php|html|asp)', "Direct login page file"),
-        ]
-        
-        for pattern, description in patterns:
-            if re.search(pattern, url):
+        for pattern, description in self._known_patterns:
+            if pattern.search(url):
                 return {
                     "score": 0.6,
                     "finding": description
@@ -3,13 +3,69 @@ Ransomware Detection Service
 File encryption detection and analysis
 """
 
+import asyncio
 import hashlib
-from typing import Dict, List, Any
+import re
+from math import log2
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+# Try to import pyahocorasick, fallback to a single case-insensitive regex
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Try to import Numba to JIT-compile the entropy kernel, fallback to NumPy
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 from utils.logger import setup_logger
 
 logger = setup_logger()
 
+# Entropy is sampled from three windows (head, middle, tail) so encrypted payloads
+# behind a plaintext header are still seen; smaller files are analyzed whole
+ENTROPY_WINDOW_SIZE = 4096
+ENTROPY_SAMPLE_SIZE = 3 * ENTROPY_WINDOW_SIZE
+
+# Below this many bytes the entropy estimate is statistical noise and is not computed
+MIN_ENTROPY_FILE_SIZE = 512
+
+# Entropy above this suggests encryption
+HIGH_ENTROPY_THRESHOLD = 7.5
+
+# log2(c) indexed by every possible byte count c, with 0 for c == 0 (c * log2(c) -> 0)
+LOG2_COUNTS = np.concatenate(([0.0], np.log2(np.arange(1, ENTROPY_SAMPLE_SIZE + 1, dtype=np.float64))))
+
+
+if NUMBA_AVAILABLE:
+    @njit(nogil=True, cache=True, boundscheck=False)
+    def entropy_kernel(data, window_size, log2_counts):
+        """Histogram the sampled windows and return their Shannon entropy, in one compiled pass"""
+        size = data.size
+        counts = np.zeros(256, dtype=np.int64)
+        if size <= 3 * window_size:
+            for i in range(size):
+                counts[data[i]] += 1
+            total = size
+        else:
+            middle = size // 2 - window_size // 2
+            for start in (0, middle, size - window_size):
+                for i in range(start, start + window_size):
+                    counts[data[i]] += 1
+            total = 3 * window_size
+        
+        weighted = 0.0
+        for c in counts:
+            weighted += c * log2_counts[c]
+        return max(np.log2(total) - weighted / total, 0.0)
+
 
 class RansomwareDetector:
     """
@@ -30,6 +86,7 @@ class RansomwareDetector:
             '.zepto', '.odin', '.thor', '.osiris', '.aesir',
             '.crypted', '.cryptowall', '.crypz', '.cryp1', '.crypt1'
         ]
+        self._ransomware_extension_set = frozenset(self.ransomware_extensions)
         
         # Known file signatures (magic bytes)
         self.file_signatures = {
@@ -42,6 +99,36 @@ class RansomwareDetector:
             'doc': [b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'],
             'exe': [b'MZ']
         }
+        
+        # Signatures bucketed by first byte, so a header is only compared against candidates
+        self._signatures_by_first_byte: Dict[int, List[Tuple[bytes, str]]] = {}
+        for file_type, signatures in self.file_signatures.items():
+            for sig in signatures:
+                self._signatures_by_first_byte.setdefault(sig[0], []).append((sig, file_type))
+        
+        # Ransom note signatures (constant), matched case-insensitively in one pass over the content
+        self.ransom_signatures = (
+            b'YOUR FILES ARE ENCRYPTED',
+            b'DECRYPT YOUR FILES',
+            b'PAY BITCOIN',
+            b'RANSOM',
+            b'wallet address',
+            b'.onion'
+        )
+        self._ransom_automaton = None
+        self._ransom_re = None
+        if AHOCORASICK_AVAILABLE:
+            # The automaton matches str keys; latin-1 maps each byte to one character
+            self._ransom_automaton = ahocorasick.Automaton()
+            for sig in self.ransom_signatures:
+                self._ransom_automaton.add_word(sig.lower().decode('latin-1'), sig)
+            self._ransom_automaton.make_automaton()
+        else:
+            self._ransom_re = re.compile(b'|'.join(map(re.escape, self.ransom_signatures)), re.IGNORECASE)
+        
+        if NUMBA_AVAILABLE:
+            # Compile (or load from the on-disk cache) before the first request
+            entropy_kernel(np.zeros(8, dtype=np.uint8), ENTROPY_WINDOW_SIZE, LOG2_COUNTS)
     
     async def check_encryption(self, file_bytes: bytes, filename: str) -> Dict[str, Any]:
         """
@@ -54,6 +141,39 @@ class RansomwareDetector:
         Returns:
             Encryption analysis result
         """
+        # CPU-bound; run in a worker thread so the event loop keeps serving requests
+        return await asyncio.to_thread(self._analyze, file_bytes, filename)
+    
+    async def check_encryption_batch(self, files: List[Tuple[bytes, str]]) -> List[Dict[str, Any]]:
+        """
+        Check several files at once, computing all entropy histograms in one pass
+        
+        Args:
+            files: (raw file bytes, original filename) pairs
+            
+        Returns:
+            Encryption analysis results, in input order
+        """
+        return await asyncio.to_thread(self._analyze_batch, files)
+    
+    def _analyze_batch(self, files: List[Tuple[bytes, str]]) -> List[Dict[str, Any]]:
+        """Run all encryption checks for a batch synchronously"""
+        entropy_results = self._analyze_entropy_batch([file_bytes for file_bytes, _ in files])
+        return [
+            self._analyze(file_bytes, filename, entropy_result)
+            for (file_bytes, filename), entropy_result in zip(files, entropy_results)
+        ]
+    
+    def _analyze(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        entropy_result: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Run all encryption checks synchronously (entropy may be precomputed by a batch)"""
+        # Slices of a memoryview share the upload's buffer instead of copying it
+        file_bytes = memoryview(file_bytes)
+        
         indicators = []
         threat_level = "none"
         is_encrypted = False
@@ -67,23 +187,29 @@ class RansomwareDetector:
             is_encrypted = True
             encryption_type = ext_result.get("type", "Unknown ransomware")
         
-        # Check 2: File header analysis
-        header_result = self._check_file_header(file_bytes, filename)
-        if header_result["suspicious"]:
-            indicators.append(header_result["indicator"])
-            if threat_level == "none":
-                threat_level = "high"
-                is_encrypted = True
-        
-        # Check 3: Entropy analysis
-        entropy_result = self._analyze_entropy(file_bytes)
-        if entropy_result["high_entropy"]:
-            indicators.append(entropy_result["indicator"])
-            if threat_level == "none":
-                threat_level = "medium"
-        
-        # Check 4: Content analysis
-        content_result = self._analyze_content(file_bytes)
+        # A known ransomware extension is already the highest verdict, so the header
+        # and entropy checks could only add indicators; skip them and bound the content scan
+        critical = threat_level == "critical"
+        
+        if not critical:
+            # Check 2: File header analysis
+            header_result = self._check_file_header(file_bytes, filename)
+            if header_result["suspicious"]:
+                indicators.append(header_result["indicator"])
+                if threat_level == "none":
+                    threat_level = "high"
+                    is_encrypted = True
+            
+            # Check 3: Entropy analysis
+            if entropy_result is None:
+                entropy_result = self._analyze_entropy(file_bytes)
+            if entropy_result["high_entropy"]:
+                indicators.append(entropy_result["indicator"])
+                if threat_level == "none":
+                    threat_level = "medium"
+        
+        # Check 4: Content analysis (ransom notes are an independent forensic signal)
+        content_result = self._analyze_content(file_bytes, 1000 if critical else 5000)
         if content_result["suspicious"]:
             indicators.append(content_result["indicator"])
         
@@ -107,24 +233,16 @@ class RansomwareDetector:
         """Check file extension for ransomware indicators"""
         filename_lower = filename.lower()
         
-        for ext in self.ransomware_extensions:
-            if filename_lower.endswith(ext):
-                return {
-                    "suspicious": True,
-                    "indicator": f"Known ransomware extension detected: {ext}",
-                    "type": f"Ransomware ({ext.replace('.', '').upper()})"
-                }
-        
-        # Check for double extensions (e.g., document.pdf.encrypted)
-        parts = filename.split('.')
-        if len(parts) > 2:
-            last_ext = f'.{parts[-1].lower()}'
-            if last_ext in self.ransomware_extensions:
-                return {
-                    "suspicious": True,
-                    "indicator": f"Double extension with ransomware suffix: {last_ext}",
-                    "type": "Unknown ransomware"
-                }
+        # Every known extension is a single '.suffix', so the last suffix decides;
+        # this also covers double extensions (e.g., document.pdf.encrypted)
+        dot = filename_lower.rfind('.')
+        ext = filename_lower[dot:] if dot >= 0 else ''
+        if ext in self._ransomware_extension_set:
+            return {
+                "suspicious": True,
+                "indicator": f"Known ransomware extension detected: {ext}",
+                "type": f"Ransomware ({ext[1:].upper()})"
+            }
         
         return {"suspicious": False}
     
@@ -134,16 +252,12 @@ class RansomwareDetector:
             return {"suspicious": True, "indicator": "File too small to analyze"}
         
         header = file_bytes[:8]
-        ext = filename.split('.')[-1].lower() if '.' in filename else ''
+        dot = filename.rfind('.')
+        ext = filename[dot + 1:].lower() if dot >= 0 else ''
         
         # Check if header matches expected format
         if ext in self.file_signatures:
-            expected_sigs = self.file_signatures[ext]
-            header_matches = any(
-                file_bytes[:len(sig)] == sig for sig in expected_sigs
-            )
-            
-            if not header_matches:
+            if self._detect_file_type(file_bytes) != ext:
                 return {
                     "suspicious": True,
                     "indicator": f"File header doesn't match .{ext} format (possible encryption)"
@@ -158,27 +272,71 @@ class RansomwareDetector:
         
         return {"suspicious": False}
     
+    def _detect_file_type(self, file_bytes: bytes) -> Optional[str]:
+        """Return the file type whose magic bytes start the file, if any"""
+        for sig, file_type in self._signatures_by_first_byte.get(file_bytes[0], ()):
+            if file_bytes[:len(sig)] == sig:
+                return file_type
+        
+        return None
+    
     def _analyze_entropy(self, file_bytes: bytes) -> Dict[str, Any]:
         """Analyze file entropy (encrypted files have high entropy)"""
-        if len(file_bytes) == 0:
-            return {"high_entropy": False, "entropy": 0}
+        if len(file_bytes) < MIN_ENTROPY_FILE_SIZE:
+            return {"high_entropy": False, "entropy": 0.0}
         
-        # Calculate byte frequency
-        byte_counts = [0] * 256
-        for byte in file_bytes[:10000]:  # Analyze first 10KB
-            byte_counts[byte] += 1
+        if NUMBA_AVAILABLE:
+            entropy = entropy_kernel(np.frombuffer(file_bytes, dtype=np.uint8), ENTROPY_WINDOW_SIZE, LOG2_COUNTS)
+            return self._entropy_result(entropy)
         
-        # Calculate entropy
-        total = min(len(file_bytes), 10000)
-        entropy = 0.0
+        # Calculate byte frequency over contiguous in-place views
+        windows = self._entropy_windows(file_bytes)
+        byte_counts = sum(np.bincount(window, minlength=256) for window in windows)
+        total = sum(len(window) for window in windows)
         
-        for count in byte_counts:
-            if count > 0:
-                freq = count / total
-                entropy -= freq * (freq and __import__('math').log2(freq))
+        # Calculate entropy: -sum((c/N) log2(c/N)) == log2(N) - sum(c log2(c)) / N
+        entropy = max(log2(total) - float(np.dot(byte_counts, LOG2_COUNTS[byte_counts])) / total, 0.0)
+        
+        return self._entropy_result(entropy)
+    
+    def _analyze_entropy_batch(self, files_bytes: List[bytes]) -> List[Dict[str, Any]]:
+        """Analyze entropy for many files with a single histogram over all samples"""
+        if not files_bytes:
+            return []
         
+        windows = [self._entropy_windows(file_bytes) for file_bytes in files_bytes]
+        totals = np.array([sum(len(w) for w in file_windows) for file_windows in windows], dtype=np.int64)
+        
+        # Offset each file's bytes by 256 * row so one bincount yields a (files, 256) histogram
+        data = np.concatenate([w for file_windows in windows for w in file_windows])
+        rows = np.repeat(np.arange(len(files_bytes), dtype=np.int64), totals)
+        byte_counts = np.bincount(rows * 256 + data, minlength=len(files_bytes) * 256)
+        byte_counts = byte_counts.reshape(len(files_bytes), 256)
+        
+        # Same identity as _analyze_entropy, per row; files too small to estimate get 0
+        safe_totals = np.maximum(totals, 1)
+        weighted = (byte_counts * LOG2_COUNTS[byte_counts]).sum(axis=1)
+        entropies = np.where(totals >= MIN_ENTROPY_FILE_SIZE, np.log2(safe_totals) - weighted / safe_totals, 0.0)
+        
+        return [self._entropy_result(max(float(entropy), 0.0)) for entropy in entropies]
+    
+    def _entropy_windows(self, file_bytes: bytes) -> List[np.ndarray]:
+        """Head, middle and tail windows sampled for entropy (the whole file if small)"""
+        data = np.frombuffer(file_bytes, dtype=np.uint8)
+        size = len(data)
+        if size <= ENTROPY_SAMPLE_SIZE:
+            return [data]
+        
+        middle = size // 2 - ENTROPY_WINDOW_SIZE // 2
+        return [
+            data[start:start + ENTROPY_WINDOW_SIZE]
+            for start in (0, middle, size - ENTROPY_WINDOW_SIZE)
+        ]
+    
+    def _entropy_result(self, entropy: float) -> Dict[str, Any]:
+        """Build the entropy check result"""
         # High entropy (> 7.5) suggests encryption
-        high_entropy = entropy > 7.5
+        high_entropy = entropy > HIGH_ENTROPY_THRESHOLD
         
         return {
             "high_entropy": high_entropy,
@@ -186,26 +344,21 @@ class RansomwareDetector:
             "indicator": f"Very high entropy ({entropy:.2f}/8) suggests encryption" if high_entropy else None
         }
     
-    def _analyze_content(self, file_bytes: bytes) -> Dict[str, Any]:
+    def _analyze_content(self, file_bytes: bytes, limit: int = 5000) -> Dict[str, Any]:
         """Analyze file content for ransomware indicators"""
-        content = file_bytes[:5000]  # Analyze first 5KB
+        content = file_bytes[:limit]  # Analyze first 5KB by default
         
         # Check for ransom note signatures
-        ransom_signatures = [
-            b'YOUR FILES ARE ENCRYPTED',
-            b'DECRYPT YOUR FILES',
-            b'PAY BITCOIN',
-            b'RANSOM',
-            b'wallet address',
-            b'.onion'
-        ]
+        if self._ransom_automaton is not None:
+            found = next(self._ransom_automaton.iter(bytes(content).lower().decode('latin-1')), None)
+        else:
+            found = self._ransom_re.search(content)
         
-        for sig in ransom_signatures:
-            if sig.lower() in content.lower():
-                return {
-                    "suspicious": True,
-                    "indicator": "Ransom note text detected in file"
-                }
+        if found:
+            return {
+                "suspicious": True,
+                "indicator": "Ransom note text detected in file"
+            }
         
         return {"suspicious": False}
     
@@ -214,8 +367,11 @@ class RansomwareDetector:
         if len(data) < 8:
             return False
         
-        # Check byte distribution
-        unique_bytes = len(set(data))
+        # Check byte distribution: one bit per byte value seen, counted with popcount
+        seen = 0
+        for byte in data:
+            seen |= 1 << byte
+        unique_bytes = seen.bit_count()
         
         # Random data typically has high unique byte ratio
         return unique_bytes > len(data) * 0.8
@@ -0,0 +1,39 @@
+"""
+In-memory LRU cache for detector results
+"""
+
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Any, Dict, Hashable, Optional
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+class LRUCache:
+    """Bounded least-recently-used cache; entries are copied in and out so callers can't mutate them"""
+    
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+    
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        self._entries.move_to_end(key)
+        return deepcopy(entry)
+    
+    def put(self, key: Hashable, result: Dict[str, Any]):
+        """Store a result, evicting the least recently used entry when full"""
+        if self.max_size <= 0:
+            return
+        
+        self._entries[key] = deepcopy(result)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
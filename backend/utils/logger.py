@@ -5,9 +5,17 @@ Logging configuration
 import sys
 from loguru import logger
 
+# Every module calls setup_logger() at import; handlers are only installed once
+_configured = False
+
 
 def setup_logger():
     """Configure and return logger"""
+    global _configured
+    if _configured:
+        return logger
+    _configured = True
+    
     # Remove default handler
     logger.remove()
     
@@ -18,9 +26,12 @@ def setup_logger():
         level="INFO"
     )
     
-    # Add file handler
+    # Add file handler: plain format (no color markup), written by a background thread
     logger.add(
         "logs/axiom_javelin.log",
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+        colorize=False,
+        enqueue=True,
         rotation="10 MB",
         retention="7 days",
         level="DEBUG"
@@ -0,0 +1,99 @@
+"""
+Streaming helpers for multipart uploads
+"""
+
+from typing import AsyncIterator, Dict
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def too_large(max_size: int) -> HTTPException:
+    """413 error for an upload over max_size bytes"""
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum size is {max_size // (1024 * 1024)}MB"
+    )
+
+
+async def iter_upload(
+    file: UploadFile, max_size: int, chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """
+    Yield an upload in chunks, aborting with 413 once it exceeds max_size
+
+    Args:
+        file: Incoming upload
+        max_size: Maximum accepted size in bytes
+        chunk_size: Size of each read
+
+    Yields:
+        Raw chunks of the upload
+    """
+    total = 0
+    while chunk := await file.read(chunk_size):
+        total += len(chunk)
+        if total > max_size:
+            raise too_large(max_size)
+        yield chunk
+
+
+async def read_upload(file: UploadFile, max_size: int) -> bytearray:
+    """Read an upload into a single buffer, stopping as soon as it exceeds max_size"""
+    buffer = bytearray()
+    async for chunk in iter_upload(file, max_size):
+        buffer += chunk
+    return buffer
+
+
+class UploadLimitMiddleware:
+    """
+    Reject oversize upload requests before the multipart body is parsed
+
+    Starlette spools the whole form to memory/disk before an endpoint runs, so
+    per-file limits alone only apply after the upload was received. Requests to
+    the configured paths are refused with 413 when their Content-Length exceeds
+    the limit, and aborted once a body without one streams past it.
+
+    Args:
+        app: Wrapped ASGI application
+        limits: Maximum upload size in bytes per request path
+    """
+    
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        max_size = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if max_size is None:
+            await self.app(scope, receive, send)
+            return
+        
+        max_body = max_size + MULTIPART_OVERHEAD
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body:
+            error = too_large(max_size)
+            response = ORJSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    # Raised while the form is parsed; FastAPI passes HTTPException through
+                    raise too_large(max_size)
+            return message
+        
+        await self.app(scope, limited_receive, send)
@@ -82,6 +82,11 @@ async function apiCall<T>(endpoint: string, options?: RequestInit): Promise<T> {
       throw new Error(`API Error: ${response.status}`);
     }
     
+    // 204 No Content (delete/resolve) has no body to parse
+    if (response.status === 204) {
+      return undefined as T;
+    }
+    
     return await response.json();
   } catch (error) {
     console.error(`API call failed: ${endpoint}`, error);